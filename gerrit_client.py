@@ -23,8 +23,10 @@ __version__ = '0.1'
 
 def write_result(result, opt):
     if opt.json_file:
+        # Compact separators keep the output small for the consumer (usually
+        # the gerrit recipe module) to read back and parse.
         with open(opt.json_file, 'w') as json_file:
-            json_file.write(json.dumps(result))
+            json_file.write(json.dumps(result, separators=(',', ':')))
 
 
 @subcommand.usage('[args ...]')
@@ -225,19 +227,29 @@ def CMDchanges(parser, args):
                       type=int,
                       help='how many changes to skip '
                       '(starting with the most recent)')
+    parser.add_option('--params_from_stdin',
+                      action='store_true',
+                      help='also read a JSON object with "query_params" '
+                      '([key, value] pairs) and "o_params" from stdin')
 
     (opt, args) = parser.parse_args(args)
-    assert opt.params or opt.query, '--param or --query required'
     for p in opt.params:
         assert '=' in p, '--param is key=value, not "%s"' % p
+    params = [tuple(p.split('=', 1)) for p in opt.params]
+    o_params = opt.o_params
+    if opt.params_from_stdin:
+        stdin_params = json.load(sys.stdin)
+        params += [(k, v) for k, v in stdin_params.get('query_params', [])]
+        o_params = (o_params or []) + stdin_params.get('o_params', [])
+    assert params or opt.query, '--param or --query required'
 
     result = gerrit_util.QueryChanges(
         urllib.parse.urlparse(opt.host).netloc,
-        list(tuple(p.split('=', 1)) for p in opt.params),
+        params,
         first_param=opt.query,
         start=opt.start,  # Default: None
         limit=opt.limit,  # Default: None
-        o_params=opt.o_params,  # Default: None
+        o_params=o_params or None,  # Default: None
     )
     logging.info('Change query returned %d changes.', len(result))
     write_result(result, opt)
@@ -302,19 +314,35 @@ def CMDcreatechange(parser, args):
 
 @subcommand.usage('[args ...]')
 def CMDchangeedit(parser, args):
-    """Puts content of a file into a change edit."""
+    """Puts content of one or more files into a change edit.
+
+    The JSON result is a list with one entry per --path, even for one file.
+    """
     parser.add_option('-c', '--change', type=int, help='change number')
-    parser.add_option('--path', help='path for file')
-    parser.add_option('--file', help='file to place at |path|')
+    parser.add_option('--path',
+                      dest='paths',
+                      action='append',
+                      default=[],
+                      help='repeatable path for file')
+    parser.add_option('--file',
+                      dest='files',
+                      action='append',
+                      default=[],
+                      help='repeatable file to place at the matching |path|')
 
     (opt, args) = parser.parse_args(args)
+    assert opt.paths, '--path required'
+    assert len(opt.files) == len(opt.paths), '--file required for each --path'
 
-    with open(opt.file) as f:
-        data = f.read()
-    result = gerrit_util.ChangeEdit(
-        urllib.parse.urlparse(opt.host).netloc, opt.change, opt.path, data)
-    logging.info(result)
-    write_result(result, opt)
+    host = urllib.parse.urlparse(opt.host).netloc
+    results = []
+    for path, filename in zip(opt.paths, opt.files):
+        with open(filename) as f:
+            data = f.read()
+        result = gerrit_util.ChangeEdit(host, opt.change, path, data)
+        logging.info(result)
+        results.append(result)
+    write_result(results, opt)
 
 
 @subcommand.usage('[args ...]')
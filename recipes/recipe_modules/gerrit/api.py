@@ -10,16 +10,26 @@ class GerritApi(recipe_api.RecipeApi):
   def __init__(self, *args, **kwargs):
     super(GerritApi, self).__init__(*args, **kwargs)
     self._changes_target_branch_cache = {}
+    self._revision_info_cache = {}
+    self._revision_commit_cache = {}
+    self._path_suffix = None
 
-  def __call__(self, name, cmd, infra_step=True, **kwargs):
-    """Wrapper for easy calling of gerrit_utils steps."""
+  def __call__(self, name, cmd, infra_step=True, stdin_json=None, **kwargs):
+    """Wrapper for easy calling of gerrit_utils steps.
+
+    If stdin_json is given, it is serialized once and passed to the step via
+    stdin instead of as command line arguments.
+    """
     assert isinstance(cmd, (list, tuple))
+    if stdin_json is not None:
+      kwargs['stdin'] = self.m.json.input(stdin_json)
     prefix = 'gerrit '
 
+    # The depot_tools root appended to PATH doesn't change during a run.
+    if self._path_suffix is None:
+      self._path_suffix = self.m.path.pathsep + str(self.repo_resource())
     env = self.m.context.env
-    env.setdefault('PATH', '%(PATH)s')
-    env['PATH'] = self.m.path.pathsep.join([
-        env['PATH'], str(self.repo_resource())])
+    env['PATH'] = env.get('PATH', '%(PATH)s') + self._path_suffix
 
     with self.m.context(env=env):
       return self.m.step(
@@ -137,6 +147,119 @@ class GerritApi(recipe_api.RecipeApi):
     ri = self.get_revision_info(host, change, patchset, timeout, step_test_data)
     return ri['commit']['message']
 
+  def get_revision_commit(self,
+                          host,
+                          change,
+                          patchset,
+                          timeout=None,
+                          step_test_data=None):
+    """Gets the commit info for a given patchset of a given change.
+
+    Unlike get_revision_info, this only fetches the requested revision instead
+    of all revisions of the change. Results are cached per
+    (host, change, patchset).
+
+    The step runs gerrit_client.py rawapi, so step_test_data must produce a
+    CommitInfo dict (see test_api.get_revision_commit_response_data), not a
+    list of changes.
+
+    Args:
+      host: URL of Gerrit host to query.
+      change: The change number.
+      patchset: The patchset number.
+
+    Returns:
+      A CommitInfo dict as documented here:
+          https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#commit-info
+      or an empty dict if the change or patchset does not exist.
+    """
+    cache_key = (host, int(change), int(patchset))
+    if cache_key in self._revision_info_cache:
+      return self._revision_info_cache[cache_key]['commit']
+    if cache_key in self._revision_commit_cache:
+      return self._revision_commit_cache[cache_key]
+
+    step_test_data = step_test_data or (
+        lambda: self.test_api.get_revision_commit_response_data())
+    commit = self.call_raw_api(
+        host,
+        '/changes/%d/revisions/%d/commit' % (int(change), int(patchset)),
+        accept_statuses=[200, 404],
+        name='get_revision_commit (%s %s)' % (change, patchset),
+        timeout=timeout,
+        step_test_data=step_test_data)
+    if commit:
+      self._revision_commit_cache[cache_key] = commit
+    return commit
+
+  def get_change_destination_branch(self,
+                                    host,
+                                    change,
+                                    name=None,
+                                    step_test_data=None):
+    """Gets the destination branch for a given change.
+
+    Args:
+      host: Gerrit host to query.
+      change: The change number.
+      name: Name of the step.
+      step_test_data: Optional mock test data for the underlying gerrit client.
+
+    Returns:
+      The name of the branch.
+    """
+    change = int(change)
+    return self.get_change_destination_branches(
+        host, [change], name=name, step_test_data=step_test_data)[change]
+
+  def get_change_destination_branches(self,
+                                      host,
+                                      changes,
+                                      name=None,
+                                      step_test_data=None):
+    """Gets the destination branches for the given changes.
+
+    Changes whose branch is not cached yet are looked up with a single
+    query, instead of one query per change.
+
+    Args:
+      host: Gerrit host to query.
+      changes: A list of change numbers.
+      name: Name of the step.
+      step_test_data: Optional mock test data for the underlying gerrit client.
+
+    Returns:
+      A dict mapping each change number to the name of its branch.
+    """
+    changes = [int(c) for c in changes]
+    missing = sorted(set(
+        c for c in changes
+        if (host, c) not in self._changes_target_branch_cache))
+    if missing:
+      step_test_data = step_test_data or (
+          lambda: self.test_api.get_multiple_changes_response_data([
+              self.test_api.gerrit_change_data(change_number=c)
+              for c in missing
+          ]))
+      cls = self.get_changes(
+          host,
+          query_params=[],
+          query=' OR '.join('change:%d' % c for c in missing),
+          limit=len(missing),
+          name=name or 'get_change_destination_branch',
+          step_test_data=step_test_data)
+      for cl in cls:
+        self._changes_target_branch_cache[(host, int(cl['_number']))] = (
+            cl['branch'])
+
+    branches = {}
+    for c in changes:
+      if (host, c) not in self._changes_target_branch_cache:
+        raise self.m.step.InfraFailure(
+            'Error querying for branch of CL %s' % c)
+      branches[c] = self._changes_target_branch_cache[(host, c)]
+    return branches
+
   def get_revision_info(self,
                         host,
                         change,
@@ -151,12 +274,20 @@ class GerritApi(recipe_api.RecipeApi):
       change: The change number.
       patchset: The patchset number.
 
+    Results are cached per (host, change, patchset), so repeated lookups of
+    the same revision only emit a step once.
+
     Returns:
       A dict for the target revision as documented here:
           https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#list-changes
     """
-    assert int(change), change
-    assert int(patchset), patchset
+    change_i, patchset_i = int(change), int(patchset)
+    assert change_i, change
+    assert patchset_i, patchset
+
+    cache_key = (host, change_i, patchset_i)
+    if cache_key in self._revision_info_cache:
+      return self._revision_info_cache[cache_key]
 
     step_test_data = step_test_data or (
         lambda: self.test_api.get_one_change_response_data(change_number=change,
@@ -168,18 +299,35 @@ class GerritApi(recipe_api.RecipeApi):
                            limit=1,
                            timeout=timeout,
                            step_test_data=step_test_data)
-    cl = cls[0] if len(cls) == 1 else {'revisions': {}}
-    for ri in cl['revisions'].values():
-      # TODO(tandrii): add support for patchset=='current'.
-      if str(ri['_number']) == str(patchset):
-        return ri
+    if cls:
+      for ri in cls[0]['revisions'].values():
+        # TODO(tandrii): add support for patchset=='current'.
+        if int(ri['_number']) == patchset_i:
+          self._revision_info_cache[cache_key] = ri
+          return ri
 
     raise self.m.step.InfraFailure(
         'Error querying for CL description: host:%r change:%r; patchset:%r' % (
             host, change, patchset))
 
+  def invalidate_cache(self, host, change=None):
+    """Drops cached change data for a host, or for a single change on it.
+
+    Call this after mutating changes outside of this module, so that later
+    lookups query Gerrit again instead of returning stale data.
+
+    Args:
+      host: Gerrit host the cached data was fetched from.
+      change: The change number. If None, all changes on host are dropped.
+    """
+    for cache in (self._changes_target_branch_cache,
+                  self._revision_info_cache, self._revision_commit_cache):
+      for key in list(cache):
+        if key[0] == host and (change is None or key[1] == int(change)):
+          del cache[key]
+
   def get_changes(self, host, query_params, start=None, limit=None,
-                  o_params=None, step_test_data=None, **kwargs):
+                  o_params=None, step_test_data=None, query=None, **kwargs):
     """Queries changes for the given host.
 
     Args:
@@ -192,6 +340,9 @@ class GerritApi(recipe_api.RecipeApi):
       * o_params: A list of additional output specifiers, as documented here:
           https://gerrit-review.googlesource.com/Documentation/rest-api-changes.html#list-changes
       * step_test_data: Optional mock test data for the underlying gerrit client.
+      * query: Optional raw search query string, e.g.
+          'change:123 OR change:456'. If query_params are also given, the
+          query is parenthesized and ANDed with them.
 
     Returns:
       A list of change dicts as documented here:
@@ -207,19 +358,37 @@ class GerritApi(recipe_api.RecipeApi):
       args += ['--start', str(start)]
     if limit:
       args += ['--limit', str(limit)]
-    for k, v in query_params:
-      args += ['-p', '%s=%s' % (k, v)]
-    for v in (o_params or []):
-      args += ['-o', v]
+    if query:
+      if query_params:
+        # Gerrit's implicit AND binds tighter than OR.
+        query = '(%s)' % query
+      args += ['--query', query]
+    # Query and output params are passed as a single JSON blob on stdin, so the
+    # command line stays short no matter how many of them there are.
+    stdin_json = None
+    params = ['%s=%s' % (k, v) for k, v in query_params]
+    params.extend('o=%s' % o for o in o_params or [])
+    if params:
+      args.append('--params_from_stdin')
+      stdin_json = {
+          'o_params': list(o_params or []),
+          'query_params': [[str(k), str(v)] for k, v in query_params],
+      }
     if not step_test_data:
       step_test_data = lambda: self.test_api.get_one_change_response_data()
 
-    return self(
-        kwargs.pop('name', 'changes'),
-        args,
-        step_test_data=step_test_data,
-        **kwargs
-    ).json.output
+    try:
+      return self(
+          kwargs.pop('name', 'changes'),
+          args,
+          step_test_data=step_test_data,
+          stdin_json=stdin_json,
+          **kwargs
+      ).json.output
+    finally:
+      # Stdin isn't shown with the step, so log what was actually queried.
+      if params:
+        self.m.step.active_result.presentation.logs['params'] = params
 
   def get_related_changes(self, host, change, revision='current', step_test_data=None):
     """Queries related changes for a given host, change, and revision.
@@ -333,6 +502,8 @@ class GerritApi(recipe_api.RecipeApi):
       step_test_data = lambda: self.test_api.get_one_change_response_data(
           branch=to_branch)
 
+    # Moved changes have a new destination branch.
+    self.invalidate_cache(host)
     return self(
         'move changes',
         args,
@@ -408,21 +579,21 @@ class GerritApi(recipe_api.RecipeApi):
                                    change] = '%s/#/q/%d' % (host, change)
 
     with self.m.step.nest('update contents in CL %d' % change):
+      # All files are edited by a single gerrit_client.py invocation rather
+      # than one step per file.
+      edit_cmd = [
+          'changeedit',
+          '--host',
+          host,
+          '--change',
+          change,
+      ]
       for path, content in new_contents_by_file_path.items():
         _file = self.m.path.mkstemp()
         self.m.file.write_raw('store the new content for %s' % path, _file,
                               content)
-        self('edit file %s' % path, [
-            'changeedit',
-            '--host',
-            host,
-            '--change',
-            change,
-            '--path',
-            path,
-            '--file',
-            _file,
-        ])
+        edit_cmd.extend(['--path', path, '--file', _file])
+      self('edit files', edit_cmd)
 
     self('publish edit', [
         'publishchangeedit',
@@ -53,6 +53,10 @@ def RunSteps(api):
   assert int(change_info['_number']) == 91827, change_info
   assert change_info['status'] == 'MERGED'
 
+  # The revision verified by update_files() is served from the cache.
+  api.gerrit.get_revision_info(host, 91827, 2)
+  api.gerrit.get_change_description(host, change=91827, patchset=2)
+
   # Query for changes in Chromium's CQ.
   api.gerrit.get_changes(
       host,
@@ -81,8 +85,45 @@ def RunSteps(api):
   )
   assert len(empty_list) == 0
 
+  # A raw query is ANDed as a whole with query_params.
+  api.gerrit.get_changes(
+      host,
+      query_params=[('status', 'open')],
+      query='change:123 OR change:124',
+      name='changes raw query',
+  )
+
   api.gerrit.get_change_description(
       host, change=123, patchset=1)
+  # Repeated lookups of the same revision are served from the cache.
+  api.gerrit.get_change_description(
+      host, change=123, patchset=1)
+  # The commit of an already fetched revision is served from the cache too.
+  api.gerrit.get_revision_commit(host, change=123, patchset=1)
+
+  # Only fetches the commit of the requested revision.
+  commit = api.gerrit.get_revision_commit(host, change=123, patchset=2)
+  assert commit['message'] == 'Change commit message', commit
+  api.gerrit.get_revision_commit(host, change=123, patchset=2)
+  # Unknown revisions aren't an error, and aren't cached.
+  commit = api.gerrit.get_revision_commit(
+      host,
+      change=122,
+      patchset=4,
+      step_test_data=(
+          api.gerrit.test_api.get_empty_revision_commit_response_data))
+  assert commit == {}, commit
+
+  branch = api.gerrit.get_change_destination_branch(host, change=123)
+  assert branch == 'main', branch
+  # Served from the cache, no additional step.
+  api.gerrit.get_change_destination_branch(host, change=123)
+  # Only the uncached changes are queried, in a single step.
+  branches = api.gerrit.get_change_destination_branches(host, [123, 124, 125])
+  assert branches == {123: 'main', 124: 'main', 125: 'main'}, branches
+  # Dropping the cached entries forces a fresh lookup.
+  api.gerrit.invalidate_cache(host, change=123)
+  api.gerrit.get_change_destination_branch(host, change=123)
 
   api.gerrit.set_change_label(host, 123, 'code-review', -1)
   api.gerrit.set_change_label(host, 123, 'commit-queue', 1)
@@ -118,4 +159,6 @@ def GenTests(api):
          + api.step_data('gerrit relatedchanges',
                          api.gerrit.get_related_changes_response_data()) +
          api.step_data('gerrit changes empty query',
+                       api.gerrit.get_empty_changes_response_data()) +
+         api.step_data('gerrit changes raw query',
                        api.gerrit.get_empty_changes_response_data()))
@@ -84,6 +84,19 @@ class GerritTestApi(recipe_test_api.RecipeTestApi):
       "revision": "67ebf73496383c6777035e374d2d664009e2aa5c"
     })
 
+  def get_revision_commit_response_data(self, **kwargs):
+    data = {
+        'commit': '184ebe53805e102605d11f6b143486d15c23a09c',
+        'subject': 'Change title',
+        'message': 'Change commit message',
+    }
+    data.update(kwargs)
+    return self._make_gerrit_response_json(data)
+
+  def get_empty_revision_commit_response_data(self):
+    # Gerrit's 404 for an unknown revision is accepted and read back as {}.
+    return self._make_gerrit_response_json({})
+
   def get_one_change_response_data(self, **kwargs):
     return self.get_multiple_changes_response_data([self.gerrit_change_data(**kwargs)])
 
@@ -0,0 +1,27 @@
+# Copyright 2024 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+from recipe_engine import post_process
+
+PYTHON_VERSION_COMPATIBILITY = 'PY3'
+
+DEPS = [
+    'gerrit',
+]
+
+
+def RunSteps(api):
+  api.gerrit.get_change_destination_branch(
+      'https://chromium-review.googlesource.com', change=123)
+
+
+def GenTests(api):
+  yield api.test(
+      'missing-change',
+      api.step_data('gerrit get_change_destination_branch',
+                    api.gerrit.get_empty_changes_response_data()),
+      api.post_process(post_process.StatusException),
+      api.post_process(post_process.DropExpectation),
+      status='INFRA_FAILURE',
+  )
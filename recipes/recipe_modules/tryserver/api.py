@@ -3,7 +3,6 @@
 # found in the LICENSE file.
 
 import contextlib
-import hashlib
 
 from recipe_engine import recipe_api
 
@@ -28,6 +27,7 @@ class TryserverApi(recipe_api.RecipeApi):
   def __init__(self, *args, **kwargs):
     super(TryserverApi, self).__init__(*args, **kwargs)
     self._gerrit_change = None  # self.m.buildbucket.common_pb2.GerritChange
+    self._gerrit_change_host_url = None
     self._gerrit_change_repo_url = None
     self._gerrit_change_repo_host = None
     self._gerrit_change_repo_project = None
@@ -100,13 +100,14 @@ class TryserverApi(recipe_api.RecipeApi):
     """Returns the review URL for the active patchset."""
     # Gerrit redirects to insert the project into the URL.
     gerrit_change = self._gerrit_change
-    return 'https://%s/c/%s/%s' % (
-          gerrit_change.host, gerrit_change.change, gerrit_change.patchset)
+    return '%s/c/%s/%s' % (self._gerrit_change_host_url, gerrit_change.change,
+                           gerrit_change.patchset)
 
   def _ensure_gerrit_change_info(self):
     """Initializes extra info about gerrit_change, fetched from Gerrit server.
 
-    Initializes _gerrit_change_target_ref and _gerrit_change_fetch_ref.
+    Initializes _gerrit_change_target_ref, _gerrit_change_fetch_ref and, if
+    gerrit_change is the current patchset, _gerrit_commit_message.
 
     May emit a step when called for the first time.
     """
@@ -125,6 +126,9 @@ class TryserverApi(recipe_api.RecipeApi):
           '_number': str(cl.patchset),
           'ref': 'refs/changes/%02d/%d/%d' % (
               cl.change % 100, cl.change, cl.patchset),
+          'commit': {
+              'message': 'Change commit message',
+          },
         },
       },
       'owner': {
@@ -132,12 +136,12 @@ class TryserverApi(recipe_api.RecipeApi):
       },
     }]
     res = self.m.gerrit.get_changes(
-        host='https://' + cl.host,
+        host=self._gerrit_change_host_url,
         query_params=[('change', cl.change)],
         # This list must remain static/hardcoded.
         # If you need extra info, either change it here (hardcoded) or
         # fetch separately.
-        o_params=['ALL_REVISIONS', 'DOWNLOAD_COMMANDS'],
+        o_params=['ALL_REVISIONS', 'CURRENT_COMMIT', 'DOWNLOAD_COMMANDS'],
         limit=1,
         name='fetch current CL info',
         timeout=480,
@@ -148,9 +152,14 @@ class TryserverApi(recipe_api.RecipeApi):
       self._gerrit_change_target_ref = (
           'refs/heads/' + self._gerrit_change_target_ref)
 
+    self._gerrit_change_fetch_ref = None
+    self._gerrit_commit_message = None
     for rev in res['revisions'].values():
       if int(rev['_number']) == self.gerrit_change.patchset:
         self._gerrit_change_fetch_ref = rev['ref']
+        # CURRENT_COMMIT only includes the commit of the current revision.
+        if 'commit' in rev:
+          self._gerrit_commit_message = rev['commit']['message']
         break
     self._gerrit_change_owner = dict(res['owner'])
     self._gerrit_info_initialized = True
@@ -180,7 +189,6 @@ class TryserverApi(recipe_api.RecipeApi):
 
     Populated iff gerrit_change is populated. Returns None if not populated.
     """
-    self._ensure_gerrit_change_info()
     if not self._gerrit_change:  #pragma: nocover
       return None
     return int(self._gerrit_change.change)
@@ -192,7 +200,6 @@ class TryserverApi(recipe_api.RecipeApi):
 
     Populated iff gerrit_change is populated Returns None if not populated..
     """
-    self._ensure_gerrit_change_info()
     if not self._gerrit_change:  #pragma: nocover
       return None
     return int(self._gerrit_change.patchset)
@@ -208,15 +215,16 @@ class TryserverApi(recipe_api.RecipeApi):
     if self.gerrit_change:
       return True
     # TODO(tandrii): remove this, once nobody is using buildbot Gerrit Poller.
-    return ('event.patchSet.ref' in self.m.properties and
-            'event.change.url' in self.m.properties and
-            'event.change.id' in self.m.properties)
+    props = self.m.properties
+    return all(k in props for k in (
+        'event.patchSet.ref', 'event.change.url', 'event.change.id'))
 
   @property
   def is_patch_in_git(self):
-    return (self.m.properties.get('patch_storage') == 'git' and
-            self.m.properties.get('patch_repo_url') and
-            self.m.properties.get('patch_ref'))
+    props = self.m.properties
+    return (props.get('patch_storage') == 'git' and
+            props.get('patch_repo_url') and
+            props.get('patch_ref'))
 
   def require_is_tryserver(self):
     if self.m.tryserver.is_tryserver:
@@ -253,13 +261,18 @@ class TryserverApi(recipe_api.RecipeApi):
           step_test_data=lambda:
             self.m.raw_io.test_api.stream_output('foo.cc'),
           **kwargs)
-    paths = [self.m.path.join(patch_root, p.decode('utf-8')) for p in
-             step_result.stdout.splitlines()]
-    paths.sort()
+    output = step_result.stdout.decode('utf-8')
+    # Join with an empty component to get patch_root with a trailing separator
+    # (or '' if there is no patch_root), so each path is a single concat.
+    prefix = self.m.path.join(patch_root, '')
     if self.m.platform.is_win:
       # Looks like "analyze" wants POSIX slashes even on Windows (since git
       # uses that format even on Windows).
-      paths = [path.replace('\\', '/') for path in paths]
+      prefix = prefix.replace('\\', '/')
+      output = output.replace('\\', '/')
+    # str.splitlines() would also split on separators like \x1c and U+2028,
+    # which may appear in file names since quotePath is off.
+    paths = sorted(prefix + p for p in output.split('\n') if p)
     step_result.presentation.logs['files'] = paths
     if report_files_via_property:
       step_result.presentation.properties[report_files_via_property] = {
@@ -342,16 +355,25 @@ class TryserverApi(recipe_api.RecipeApi):
     return self._get_footers(patch_text)
 
   def _ensure_gerrit_commit_message(self):
-    """Fetch full commit message for Gerrit change."""
-    if self._gerrit_commit_message:
-      return
+    """Fetch full commit message for Gerrit change.
 
+    The message of the current patchset is part of the CL info fetched by
+    _ensure_gerrit_change_info. Older patchsets need a separate lookup.
+    """
     self._ensure_gerrit_change_info()
-    self._gerrit_commit_message = self.m.gerrit.get_change_description(
-        'https://%s' % self.gerrit_change.host,
-        self.gerrit_change_number,
-        self.gerrit_patchset_number,
-        timeout=480)
+    if self._gerrit_commit_message is not None:
+      return
+
+    cl = self.gerrit_change
+    commit = None
+    if self._gerrit_change_fetch_ref is not None:
+      commit = self.m.gerrit.get_revision_commit(
+          self._gerrit_change_host_url, cl.change, cl.patchset, timeout=480)
+    if not commit:
+      raise self.m.step.InfraFailure(
+          'Error querying for CL description: host:%r change:%r; patchset:%r' %
+          (self._gerrit_change_host_url, cl.change, cl.patchset))
+    self._gerrit_commit_message = commit['message']
 
   def _get_footers(self, patch_text=None):
     if patch_text is not None:
@@ -385,7 +407,9 @@ class TryserverApi(recipe_api.RecipeApi):
     return footers.get(tag, [])
 
   def normalize_footer_name(self, footer):
-    return '-'.join([ word.title() for word in footer.strip().split('-') ])
+    # title() already starts a new word after every '-', so this matches
+    # title-casing each '-'-separated word on its own.
+    return footer.strip().title()
 
   def get_change_description(self):
     """Gets the CL description."""
@@ -399,7 +423,9 @@ class TryserverApi(recipe_api.RecipeApi):
       * change: a self.m.buildbucket.common_pb2.GerritChange.
     """
     self._gerrit_info_initialized = False
+    self._change_footers = None
     self._gerrit_change = change
+    self._gerrit_change_host_url = 'https://%s' % change.host
     gs_suffix = '-review.googlesource.com'
     host = change.host
     if host.endswith(gs_suffix):
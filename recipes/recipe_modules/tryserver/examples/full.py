@@ -57,7 +57,8 @@ def RunSteps(api):
   api.tryserver.set_test_timeout_tryjob_result()
   api.tryserver.set_test_expired_tryjob_result()
 
-  api.tryserver.normalize_footer_name('Cr-Commit-Position')
+  assert api.tryserver.normalize_footer_name(
+      ' cr-COMMIT-position ') == 'Cr-Commit-Position'
 
   api.tryserver.set_change(
       GerritChange(host='chromium-review.googlesource.com',
@@ -23,8 +23,9 @@ def GenTests(api):
   yield api.test(
       'basic',
       api.buildbucket.try_build(),
-      api.post_process(MustRun, 'gerrit changes'),
-      api.post_process(DoesNotRun, 'gerrit changes (2)'),
+      api.post_process(MustRun, 'gerrit fetch current CL info'),
+      api.post_process(DoesNotRun, 'gerrit fetch current CL info (2)'),
+      api.post_process(DoesNotRun, 'gerrit changes'),
       api.post_process(StatusSuccess),
       api.post_process(DropExpectation),
   )
@@ -10,6 +10,7 @@ DEPS = [
     'tryserver',
     'recipe_engine/assertions',
     'recipe_engine/buildbucket',
+    'recipe_engine/json',
     'recipe_engine/path',
     'recipe_engine/platform',
     'recipe_engine/properties',
@@ -63,3 +64,71 @@ def GenTests(api):
       api.post_check(post_process.StatusSuccess),
       api.post_process(post_process.DropExpectation),
   )
+
+  def cl_info(patchset, **revision):
+    revision.update({
+        '_number': str(patchset),
+        'ref': 'refs/changes/27/91827/%d' % patchset,
+    })
+    return api.override_step_data(
+        'gerrit fetch current CL info',
+        api.json.output([{
+            'branch': 'main',
+            'revisions': {
+                '184ebe53805e102605d11f6b143486d15c23a09c': revision,
+            },
+            'owner': {
+                'name': 'John Doe',
+            },
+        }]))
+
+  yield api.test(
+      'older-patchset',
+      api.buildbucket.try_build(
+          'chromium',
+          'linux',
+          change_number=91827,
+          patch_set=1,
+      ),
+      api.properties(expected_footers={}),
+      cl_info(1),
+      api.tryserver.get_footers({}),
+      api.post_check(post_process.MustRun,
+                     'gerrit get_revision_commit (91827 1)'),
+      api.post_check(post_process.StatusSuccess),
+      api.post_process(post_process.DropExpectation),
+  )
+
+  yield api.test(
+      'missing-revision-commit',
+      api.buildbucket.try_build(
+          'chromium',
+          'linux',
+          change_number=91827,
+          patch_set=1,
+      ),
+      api.properties(expected_footers={}),
+      cl_info(1),
+      api.override_step_data('gerrit get_revision_commit (91827 1)',
+                             api.json.output({})),
+      api.post_check(post_process.DoesNotRun, 'parse description'),
+      api.post_check(post_process.StatusException),
+      api.post_process(post_process.DropExpectation),
+      status='INFRA_FAILURE',
+  )
+
+  yield api.test(
+      'wrong-patchset',
+      api.buildbucket.try_build(
+          'chromium',
+          'linux',
+          change_number=91827,
+          patch_set=1,
+      ),
+      api.properties(expected_footers={}),
+      cl_info(2, commit={'message': 'Patchset 2 message'}),
+      api.post_check(post_process.DoesNotRun, 'parse description'),
+      api.post_check(post_process.StatusException),
+      api.post_process(post_process.DropExpectation),
+      status='INFRA_FAILURE',
+  )
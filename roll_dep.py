@@ -9,18 +9,22 @@ always roll to the tip of to origin/main.
 """
 
 import argparse
+import collections
+import concurrent.futures
+import functools
 import itertools
 import os
 import re
 import subprocess2
 import sys
-import tempfile
 
 import gclient_utils
 
 NEED_SHELL = sys.platform.startswith('win')
 GCLIENT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                             'gclient.py')
+# Maximum number of dependencies whose git commands run at the same time.
+MAX_CONCURRENT_DEPS = 8
 
 # Commit subject that will be considered a roll. In the format generated by the
 # git log used, so it's "<year>-<month>-<day> <author> <subject>"
@@ -79,6 +83,21 @@ def check_call(*args, **kwargs):
     subprocess2.check_call(*args, **kwargs)
 
 
+def iter_output_lines(args, **kwargs):
+    """Yields the stdout lines of a command as it writes them.
+
+    Like check_output(), but the output is never held in memory as a whole.
+    """
+    kwargs.setdefault('shell', NEED_SHELL)
+    kwargs.setdefault('stdin', subprocess2.DEVNULL)
+    with subprocess2.Popen(args, stdout=subprocess2.PIPE, **kwargs) as proc:
+        for line in proc.stdout:
+            yield line.decode('utf-8').rstrip('\n')
+    if proc.returncode:
+        raise subprocess2.CalledProcessError(proc.returncode, args,
+                                             kwargs.get('cwd'), None, None)
+
+
 def return_code(*args, **kwargs):
     """subprocess2.call() passing shell=True on Windows for git and
     subprocess2.DEVNULL for stdout and stderr."""
@@ -92,26 +111,37 @@ def is_pristine(root):
     """Returns True if a git checkout is pristine."""
     # `git rev-parse --verify` has a non-zero return code if the revision
     # doesn't exist.
-    diff_cmd = ['git', 'diff', '--ignore-submodules', 'origin/main']
-    return (not check_output(diff_cmd, cwd=root).strip()
-            and not check_output(diff_cmd + ['--cached'], cwd=root).strip())
+    # With --quiet, `git diff` exits with 1 as soon as it finds a difference
+    # instead of printing the whole diff. Any other non-zero code is an error.
+    diff_cmd = ['git', 'diff', '--quiet', '--ignore-submodules', 'origin/main']
+    for cmd in (diff_cmd, [*diff_cmd, '--cached']):
+        code = return_code(cmd, cwd=root, stderr=None)
+        if code == 1:
+            return False
+        if code:
+            raise subprocess2.CalledProcessError(code, cmd, root, None, None)
+    return True
 
 
 def get_gerrit_host(url):
     """Returns the host for a given Gitiles URL."""
-    m = re.match(r'https://([^/]*)\.googlesource\.com/', url)
-    return m and m.group(1)
+    if not url.startswith('https://'):
+        return None
+    host, slash, _ = url[len('https://'):].partition('/')
+    if not slash or not host.endswith('.googlesource.com'):
+        return None
+    return host[:-len('.googlesource.com')]
 
 
 def get_log_url(upstream_url, head, tot):
     """Returns an URL to read logs via a Web UI if applicable."""
     if get_gerrit_host(upstream_url):
-        return '%s/+log/%s..%s' % (upstream_url, head[:12], tot[:12])
+        return f'{upstream_url}/+log/{head[:12]}..{tot[:12]}'
     if upstream_url.startswith('https://github.com/'):
         upstream_url = upstream_url.rstrip('/')
         if upstream_url.endswith('.git'):
             upstream_url = upstream_url[:-len('.git')]
-        return '%s/compare/%s...%s' % (upstream_url, head[:12], tot[:12])
+        return f'{upstream_url}/compare/{head[:12]}...{tot[:12]}'
     return None
 
 
@@ -125,32 +155,71 @@ def should_show_log(upstream_url):
     return get_gerrit_host(upstream_url) in _PUBLIC_GERRIT_HOSTS
 
 
+def run_concurrently(fn, items):
+    """Returns [fn(item) for item in items], running the calls in threads.
+
+    The calls are mostly spent waiting on git subprocesses, so threads are
+    enough to overlap them. The first exception raised by a call is re-raised.
+    """
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=MAX_CONCURRENT_DEPS) as executor:
+        return list(executor.map(fn, items))
+
+
 def gclient(args):
     """Executes gclient with the given args and returns the stdout."""
-    return check_output([sys.executable, GCLIENT_PATH] + args).strip()
+    return check_output([sys.executable, GCLIENT_PATH, *args]).strip()
+
+
+def strip_author_email(line):
+    """Strips the email domain from a "<date> <author email> <subject>" line.
+
+    Only the part of the author email before the @ is kept.
+    """
+    author, at, rest = line.partition('@')
+    domain_end = rest.find(' ')
+    # --date=short dates are "YYYY-MM-DD", followed by a space.
+    if not at or domain_end <= 0 or len(author) <= len('YYYY-MM-DD '):
+        return line
+    return author + rest[domain_end:]
 
 
 def generate_commit_message(full_dir, dependency, head, roll_to, upstream_url,
                             show_log, log_limit):
     """Creates the commit message for this specific roll."""
-    commit_range = '%s..%s' % (head, roll_to)
-    commit_range_for_header = '%s..%s' % (head[:9], roll_to[:9])
+    commit_range = f'{head}..{roll_to}'
+    commit_range_for_header = f'{head[:9]}..{roll_to[:9]}'
     cmd = ['git', 'log', commit_range, '--date=short', '--no-merges']
-    logs = check_output(
+    # Filter out rolls and strip author emails in a single pass over the
+    # streamed log. Roll subjects match with or without the email, so only
+    # kept lines need stripping. At most the first N/2 and last N/2 kept
+    # entries are shown, so only those are held on to.
+    nb_commits = 0
+    nb_cleaned = 0
+    first_lines = []
+    last_lines = collections.deque(maxlen=(log_limit + 1) // 2 or None)
+    log_lines = iter_output_lines(
         # Args with '=' are automatically quoted.
-        cmd + ['--format=%ad %ae %s', '--'],
-        cwd=full_dir).rstrip()
-    logs = re.sub(r'(?m)^(\d\d\d\d-\d\d-\d\d [^@]+)@[^ ]+( .*)$', r'\1\2', logs)
-    lines = logs.splitlines()
-    cleaned_lines = [l for l in lines if not _ROLL_SUBJECT.match(l)]
-    logs = '\n'.join(cleaned_lines) + '\n'
-
-    nb_commits = len(lines)
-    rolls = nb_commits - len(cleaned_lines)
-    header = 'Roll %s/ %s (%d commit%s%s)\n\n' % (
-        dependency, commit_range_for_header, nb_commits,
-        's' if nb_commits > 1 else '',
-        ('; %s trivial rolls' % rolls) if rolls else '')
+        [*cmd, '--format=%ad %ae %s', '--'],
+        cwd=full_dir)
+    for line in log_lines:
+        nb_commits += 1
+        # Every roll subject contains 'Roll ', so most lines can skip the
+        # regex.
+        if 'Roll ' in line and _ROLL_SUBJECT.match(line):
+            continue
+        nb_cleaned += 1
+        line = strip_author_email(line)
+        if len(first_lines) < log_limit // 2:
+            first_lines.append(line)
+        else:
+            last_lines.append(line)
+
+    rolls = nb_commits - nb_cleaned
+    plural = 's' if nb_commits > 1 else ''
+    trivial_rolls = f'; {rolls} trivial rolls' if rolls else ''
+    header = (f'Roll {dependency}/ {commit_range_for_header} '
+              f'({nb_commits} commit{plural}{trivial_rolls})\n\n')
     log_section = ''
     if log_url := get_log_url(upstream_url, head, roll_to):
         log_section = log_url + '\n\n'
@@ -160,44 +229,60 @@ def generate_commit_message(full_dir, dependency, head, roll_to, upstream_url,
         log_section += '$ %s ' % ' '.join(cmd)
         log_section += '--format=\'%ad %ae %s\'\n'
         log_section = log_section.replace(commit_range, commit_range_for_header)
-        if len(cleaned_lines) > log_limit:
+        if nb_cleaned > log_limit:
             # Keep the first N/2 log entries and last N/2 entries.
-            lines = logs.splitlines(True)
-            lines = lines[:log_limit // 2] + ['(...)\n'
-                                              ] + lines[-log_limit // 2:]
-            logs = ''.join(lines)
-        log_section += logs + '\n'
+            first_lines.append('(...)')
+        first_lines.extend(last_lines)
+        log_section += '\n'.join(first_lines) + '\n\n'
     return header + log_section
 
 
+@functools.lru_cache(maxsize=None)
+def get_gclient_root():
+    """Returns the gclient root, which doesn't change during a run."""
+    return gclient(['root'])
+
+
+@functools.lru_cache(maxsize=None)
 def is_submoduled():
     """Returns true if gclient root has submodules"""
-    return os.path.isfile(os.path.join(gclient(['root']), ".gitmodules"))
+    return os.path.isfile(os.path.join(get_gclient_root(), ".gitmodules"))
 
 
-def get_submodule_rev(submodule):
-    """Returns revision of the given submodule path"""
-    rev_output = check_output(['git', 'submodule', 'status', submodule],
-                              cwd=gclient(['root'])).strip()
+def get_submodule_revs(submodules):
+    """Returns a dict of the given submodule paths to their revisions."""
+    rev_output = check_output(['git', 'submodule', 'status', '--', *submodules],
+                              cwd=get_gclient_root())
 
-    # git submodule status <path> returns all submodules with its rev in the
-    # pattern: `(+|-| )(<revision>) (submodule.path)`
-    revision = rev_output.split(' ')[0]
-    return revision[1:] if revision[0] in ('+', '-') else revision
+    # git submodule status <paths> returns the submodules with their rev in the
+    # pattern: `(+|-|U| )(<revision>) (submodule.path)( (<describe>))`
+    revs = {}
+    for line in rev_output.splitlines():
+        revision, _, path = line[1:].partition(' ')
+        revs[path.partition(' (')[0]] = revision
+    return revs
 
 
-def calculate_roll(full_dir, dependency, roll_to):
+def calculate_roll(full_dir, dependency, roll_to, submodule_revs=None):
     """Calculates the roll for a dependency by processing gclient_dict, and
     fetching the dependency via git.
+
+    submodule_revs is the result of get_submodule_revs() if the super-project
+    uses submodules.
     """
     # if the super-project uses submodules, get rev directly using git.
-    if is_submoduled():
-        head = get_submodule_rev(dependency)
+    if submodule_revs is not None:
+        head = submodule_revs.get(dependency)
     else:
         head = gclient(['getdep', '-r', dependency])
     if not head:
         raise Error('%s is unpinned.' % dependency)
-    check_call(['git', 'fetch', 'origin', '--quiet'], cwd=full_dir)
+    fetch_cmd = ['git', 'fetch', 'origin', '--quiet']
+    if roll_to == 'origin/HEAD':
+        # Tags are only needed when rolling to a user-provided revision, which
+        # may be a tag.
+        fetch_cmd.append('--no-tags')
+    check_call(fetch_cmd, cwd=full_dir)
     if roll_to == 'origin/HEAD':
         check_output(['git', 'remote', 'set-head', 'origin', '-a'],
                      cwd=full_dir)
@@ -226,26 +311,26 @@ def finalize(commit_msg, current_dir, rolls):
     # Pull the dependency to the right revision. This is surprising to users
     # otherwise. The revision update is done before commiting to update
     # submodule revision if present.
-    for dependency, (_head, roll_to, full_dir) in sorted(rolls.items()):
-        check_call(['git', 'checkout', '--quiet', roll_to], cwd=full_dir)
-
-        # This adds the submodule revision update to the commit.
-        if is_submoduled():
-            check_call([
-                'git', 'update-index', '--add', '--cacheinfo',
-                '160000,{},{}'.format(roll_to, dependency)
-            ],
-                       cwd=current_dir)
+    # Each dependency is its own checkout, so they can be updated concurrently.
+    run_concurrently(
+        lambda roll: check_call(['git', 'checkout', '--quiet', roll[0]],
+                                cwd=roll[1]),
+        [(roll_to, full_dir) for _head, roll_to, full_dir in rolls.values()])
+
+    # This adds the submodule revision updates to the commit. All of them go
+    # through a single update-index, as they share the super-project's index.
+    if is_submoduled():
+        update_index_cmd = ['git', 'update-index', '--add']
+        for dependency, (_head, roll_to, _full_dir) in rolls.items():
+            update_index_cmd.extend(
+                ['--cacheinfo', '160000,{},{}'.format(roll_to, dependency)])
+        check_call(update_index_cmd, cwd=current_dir)
 
     check_call(['git', 'add', 'DEPS'], cwd=current_dir)
-    # We have to set delete=False and then let the object go out of scope so
-    # that the file can be opened by name on Windows.
-    with tempfile.NamedTemporaryFile('w+', newline='', delete=False) as f:
-        commit_filename = f.name
-        f.write(commit_msg)
-    check_call(['git', 'commit', '--quiet', '--file', commit_filename],
-               cwd=current_dir)
-    os.remove(commit_filename)
+    # Pass the message on stdin rather than through a temporary file.
+    check_call(['git', 'commit', '--quiet', '--file', '-'],
+               cwd=current_dir,
+               stdin=commit_msg.encode('utf-8'))
 
 
 def main():
@@ -312,7 +397,7 @@ def main():
             if not '@' in r:
                 reviewers[i] = r + '@chromium.org'
 
-    gclient_root = gclient(['root'])
+    gclient_root = get_gclient_root()
     current_dir = os.getcwd()
     dependencies = sorted(
         d.replace('\\', '/').rstrip('/') for d in args.dep_path)
@@ -324,7 +409,7 @@ def main():
                         current_dir)
         # First gather all the information without modifying anything, except
         # for a git fetch.
-        rolls = {}
+        full_dirs = []
         for dependency in dependencies:
             full_dir = os.path.normpath(os.path.join(gclient_root, dependency))
             if not os.path.isdir(full_dir):
@@ -335,8 +420,22 @@ def main():
                 if not os.path.isdir(full_dir):
                     raise Error('Directory not found: %s (%s)' %
                                 (dependency, full_dir))
+            full_dirs.append(full_dir)
+
+        submodule_revs = None
+        if is_submoduled():
+            submodule_revs = get_submodule_revs(dependencies)
 
-            head, roll_to = calculate_roll(full_dir, dependency, args.roll_to)
+        # Each roll fetches its dependency, so compute them concurrently.
+        calculated_rolls = run_concurrently(
+            lambda d: calculate_roll(d[0], d[1], args.roll_to, submodule_revs),
+            list(zip(full_dirs, dependencies)))
+
+        # Filled in dependency order, so rolls is already sorted.
+        rolls = {}
+        for dependency, full_dir, calculated_roll in zip(
+                dependencies, full_dirs, calculated_rolls):
+            head, roll_to = calculated_roll
             if roll_to == head:
                 if len(dependencies) == 1:
                     raise AlreadyRolledError('No revision to roll!')
@@ -346,25 +445,31 @@ def main():
                       (dependency, head[:10], roll_to[:10]))
                 rolls[dependency] = (head, roll_to, full_dir)
 
-        logs = []
-        setdep_args = []
-        for dependency, (head, roll_to, full_dir) in sorted(rolls.items()):
+        def roll_log(roll):
+            dependency, (head, roll_to, full_dir) = roll
             upstream_url = check_output(['git', 'config', 'remote.origin.url'],
                                         cwd=full_dir).strip()
             show_log = args.always_log or \
                 (not args.no_log and should_show_log(upstream_url))
+            log = generate_commit_message(full_dir, dependency, head, roll_to,
+                                          upstream_url, show_log,
+                                          args.log_limit)
+            return show_log, log
+
+        sorted_rolls = list(rolls.items())
+        logs = []
+        setdep_args = []
+        for (dependency, (_head, roll_to, _full_dir)), (show_log, log) in zip(
+                sorted_rolls, run_concurrently(roll_log, sorted_rolls)):
             if not show_log:
                 print(
                     f'{dependency}: Omitting git log from the commit message. '
                     'Use the `--always-log` flag to include it.')
-            log = generate_commit_message(full_dir, dependency, head, roll_to,
-                                          upstream_url, show_log,
-                                          args.log_limit)
             logs.append(log)
             setdep_args.extend(['-r', '{}@{}'.format(dependency, roll_to)])
 
         # DEPS is updated even if the repository uses submodules.
-        gclient(['setdep'] + setdep_args)
+        gclient(['setdep', *setdep_args])
 
         commit_msg = gen_commit_msg(logs, cmdline, reviewers, args.bug)
         finalize(commit_msg, current_dir, rolls)
@@ -5,6 +5,7 @@
 # found in the LICENSE file.
 """Unit tests for gerrit_client.py."""
 
+import io
 import logging
 import os
 import sys
@@ -92,6 +93,22 @@ class TestGerritClient(unittest.TestCase):
                                           start=20,
                                           o_params=None)
 
+    @mock.patch('gerrit_util.QueryChanges', return_value='')
+    def test_changes_params_from_stdin(self, util_mock):
+        stdin = io.StringIO(
+            '{"o_params": ["op2"], "query_params": [["baz", "qux"]]}')
+        with mock.patch('sys.stdin', stdin):
+            gerrit_client.main([
+                'changes', '--host', 'https://example.org/foo', '-p', 'foo=bar',
+                '-o', 'op1', '--params_from_stdin'
+            ])
+        util_mock.assert_called_once_with('example.org', [('foo', 'bar'),
+                                                          ('baz', 'qux')],
+                                          first_param=None,
+                                          limit=None,
+                                          start=None,
+                                          o_params=['op1', 'op2'])
+
     @mock.patch('gerrit_util.GetRelatedChanges', return_value='')
     def test_relatedchanges(self, util_mock):
         gerrit_client.main([
@@ -126,6 +143,32 @@ class TestGerritClient(unittest.TestCase):
         util_mock.assert_called_once_with('example.org', 1, 'path/to/file',
                                           'test_data')
 
+    @mock.patch('builtins.open', mock.mock_open())
+    @mock.patch('gerrit_util.ChangeEdit', return_value='')
+    def test_changeedit_multiple_files(self, util_mock):
+        open().read.return_value = 'test_data'
+        gerrit_client.main([
+            'changeedit', '--host', 'https://example.org/foo', '--change', '1',
+            '--path', 'path/to/file', '--file', '/my/foo', '--path',
+            'path/to/other', '--file', '/my/bar'
+        ])
+        util_mock.assert_has_calls([
+            mock.call('example.org', 1, 'path/to/file', 'test_data'),
+            mock.call('example.org', 1, 'path/to/other', 'test_data'),
+        ])
+        self.assertEqual(util_mock.call_count, 2)
+
+    @mock.patch('builtins.open', mock.mock_open())
+    @mock.patch('gerrit_client.write_result')
+    @mock.patch('gerrit_util.ChangeEdit', return_value={})
+    def test_changeedit_result_is_list(self, _, write_result_mock):
+        open().read.return_value = 'test_data'
+        gerrit_client.main([
+            'changeedit', '--host', 'https://example.org/foo', '--change', '1',
+            '--path', 'path/to/file', '--file', '/my/foo'
+        ])
+        self.assertEqual([{}], write_result_mock.call_args[0][0])
+
     @mock.patch('gerrit_util.PublishChangeEdit', return_value='')
     def test_publishchangeedit(self, util_mock):
         gerrit_client.main([
@@ -158,6 +201,13 @@ class TestGerritClient(unittest.TestCase):
                                           1,
                                           labels={'some-label': '-2'})
 
+    @mock.patch('builtins.open', new_callable=mock.mock_open)
+    def test_write_result_compact(self, open_mock):
+        opt = mock.Mock(json_file='/my/out.json')
+        gerrit_client.write_result({'a': [1, 2]}, opt)
+        open_mock.assert_called_once_with('/my/out.json', 'w')
+        open_mock().write.assert_called_once_with('{"a":[1,2]}')
+
 
 if __name__ == '__main__':
     logging.basicConfig(
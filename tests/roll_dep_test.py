@@ -215,9 +215,15 @@ class CommitMessageTest(unittest.TestCase):
         ])
 
         # Mock the `git log` call.
-        mock.patch('roll_dep.check_output', return_value=self.logs).start()
+        self.iter_output_lines = mock.patch(
+            'roll_dep.iter_output_lines').start()
+        self.set_git_log(self.logs)
         self.addCleanup(mock.patch.stopall)
 
+    def set_git_log(self, logs):
+        self.iter_output_lines.side_effect = (
+            lambda *args, **kwargs: iter(logs.splitlines()))
+
     def testShowShortLog(self):
         message = roll_dep.generate_commit_message(
             '/path/to/dir', 'dep', 'abc', 'def',
@@ -235,6 +241,62 @@ class CommitMessageTest(unittest.TestCase):
         self.assertNotIn('$ git log', message)
         self.assertNotIn(self.logs, message)
 
+    def testStripsAuthorEmailDomain(self):
+        self.set_git_log('\n'.join([
+            '2024-04-05 alice@example.com Goodbye',
+            '2024-04-03 bob@chromium.org Hello World',
+        ]))
+        message = roll_dep.generate_commit_message(
+            '/path/to/dir', 'dep', 'abc', 'def',
+            'https://chromium.googlesource.com', True, 10)
+
+        self.assertIn(self.logs, message)
+        self.assertNotIn('example.com', message)
+
+    def testSkipsTrivialRolls(self):
+        self.set_git_log('\n'.join([
+            '2024-04-06 autoroll@example.com '
+            'Roll recipe dependencies (trivial).',
+            '2024-04-05 alice Goodbye',
+            '2024-04-03 bob Hello World',
+        ]))
+        message = roll_dep.generate_commit_message(
+            '/path/to/dir', 'dep', 'abc', 'def',
+            'https://chromium.googlesource.com', True, 10)
+
+        self.assertIn('Roll dep/ abc..def (3 commits; 1 trivial rolls)',
+                      message)
+        self.assertIn(self.logs, message)
+        self.assertNotIn('autoroll', message)
+
+    def testTrimsLongLog(self):
+        self.set_git_log('\n'.join('2024-04-%02d alice Change %d' % (i, i)
+                                   for i in range(1, 6)))
+        message = roll_dep.generate_commit_message(
+            '/path/to/dir', 'dep', 'abc', 'def',
+            'https://chromium.googlesource.com', True, 3)
+
+        self.assertIn('Roll dep/ abc..def (5 commits)', message)
+        self.assertIn(
+            '\n'.join([
+                '2024-04-01 alice Change 1',
+                '(...)',
+                '2024-04-04 alice Change 4',
+                '2024-04-05 alice Change 5',
+            ]) + '\n\n', message)
+
+    def testStripAuthorEmail(self):
+        self.assertEqual(
+            '2024-04-05 alice Hello World',
+            roll_dep.strip_author_email(
+                '2024-04-05 alice@example.com Hello World'))
+        # Lines without an author email are left alone.
+        self.assertEqual('2024-04-05  Hello World',
+                         roll_dep.strip_author_email('2024-04-05  Hello World'))
+        self.assertEqual(
+            '2024-04-05 alice@example.com',
+            roll_dep.strip_author_email('2024-04-05 alice@example.com'))
+
     def testShouldShowLogWithPublicHost(self):
         self.assertTrue(
             roll_dep.should_show_log(
@@ -245,6 +307,166 @@ class CommitMessageTest(unittest.TestCase):
             roll_dep.should_show_log(
                 'https://private.googlesource.com/project'))
 
+    def testGetGerritHost(self):
+        self.assertEqual(
+            'chromium',
+            roll_dep.get_gerrit_host(
+                'https://chromium.googlesource.com/chromium/src'))
+        self.assertIsNone(
+            roll_dep.get_gerrit_host('https://chromium.googlesource.com'))
+        self.assertIsNone(
+            roll_dep.get_gerrit_host(
+                'https://github.com/foo/bar.googlesource.com/'))
+        self.assertIsNone(
+            roll_dep.get_gerrit_host('http://chromium.googlesource.com/src'))
+
+    def testGetLogUrl(self):
+        head = '0123456789abcdef'
+        tot = 'fedcba9876543210'
+        self.assertEqual(
+            'https://chromium.googlesource.com/src/+log/'
+            '0123456789ab..fedcba987654',
+            roll_dep.get_log_url('https://chromium.googlesource.com/src', head,
+                                 tot))
+        self.assertEqual(
+            'https://github.com/foo/bar/compare/0123456789ab...fedcba987654',
+            roll_dep.get_log_url('https://github.com/foo/bar.git/', head, tot))
+        self.assertIsNone(
+            roll_dep.get_log_url('https://example.com/foo', head, tot))
+
+
+class GclientRootTest(unittest.TestCase):
+
+    def setUp(self):
+        roll_dep.get_gclient_root.cache_clear()
+        roll_dep.is_submoduled.cache_clear()
+        self.addCleanup(roll_dep.get_gclient_root.cache_clear)
+        self.addCleanup(roll_dep.is_submoduled.cache_clear)
+        self.gclient = mock.patch('roll_dep.gclient',
+                                  return_value='/path/to/root').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def testGclientRootRunsGclientOnce(self):
+        self.assertEqual('/path/to/root', roll_dep.get_gclient_root())
+        self.assertEqual('/path/to/root', roll_dep.get_gclient_root())
+        self.gclient.assert_called_once_with(['root'])
+
+    @mock.patch('os.path.isfile', return_value=True)
+    def testIsSubmoduledChecksOnce(self, isfile):
+        self.assertTrue(roll_dep.is_submoduled())
+        self.assertTrue(roll_dep.is_submoduled())
+        isfile.assert_called_once_with(
+            os.path.join('/path/to/root', '.gitmodules'))
+        self.gclient.assert_called_once_with(['root'])
+
+
+class IterOutputLinesTest(unittest.TestCase):
+
+    def testYieldsLines(self):
+        cmd = [sys.executable, '-c', 'print("a"); print("b")']
+        self.assertEqual(['a', 'b'],
+                         list(roll_dep.iter_output_lines(cmd, shell=False)))
+
+    def testDoesNotInheritStdin(self):
+        cmd = [sys.executable, '-c', 'import sys; print(len(sys.stdin.read()))']
+        self.assertEqual(['0'],
+                         list(roll_dep.iter_output_lines(cmd, shell=False)))
+
+    def testRaisesOnFailure(self):
+        cmd = [sys.executable, '-c', 'import sys; sys.exit(1)']
+        with self.assertRaises(roll_dep.subprocess2.CalledProcessError):
+            list(roll_dep.iter_output_lines(cmd, shell=False))
+
+
+class GetSubmoduleRevsTest(unittest.TestCase):
+
+    @mock.patch('roll_dep.get_gclient_root', return_value='/path/to/root')
+    @mock.patch('roll_dep.check_output')
+    def testParsesStatus(self, check_output, _):
+        check_output.return_value = '\n'.join([
+            ' 1111111111111111111111111111111111111111 src/foo (heads/main)',
+            '+2222222222222222222222222222222222222222 src/bar',
+            '-3333333333333333333333333333333333333333 src/baz',
+        ]) + '\n'
+        paths = ['src/foo', 'src/bar', 'src/baz']
+        self.assertEqual(
+            {
+                'src/foo': '1111111111111111111111111111111111111111',
+                'src/bar': '2222222222222222222222222222222222222222',
+                'src/baz': '3333333333333333333333333333333333333333',
+            }, roll_dep.get_submodule_revs(paths))
+        check_output.assert_called_once_with(
+            ['git', 'submodule', 'status', '--', *paths], cwd='/path/to/root')
+
+
+class IsPristineTest(unittest.TestCase):
+
+    @mock.patch('roll_dep.return_code', return_value=0)
+    def testPristine(self, return_code):
+        self.assertTrue(roll_dep.is_pristine('/path/to/root'))
+        self.assertEqual(2, return_code.call_count)
+
+    @mock.patch('roll_dep.return_code', return_value=1)
+    def testDirtyStopsAtFirstDiff(self, return_code):
+        self.assertFalse(roll_dep.is_pristine('/path/to/root'))
+        return_code.assert_called_once_with(
+            ['git', 'diff', '--quiet', '--ignore-submodules', 'origin/main'],
+            cwd='/path/to/root',
+            stderr=None)
+
+    @mock.patch('roll_dep.return_code', return_value=128)
+    def testRaisesOnGitError(self, _):
+        with self.assertRaises(roll_dep.subprocess2.CalledProcessError):
+            roll_dep.is_pristine('/path/to/root')
+
+
+class FinalizeTest(unittest.TestCase):
+
+    @mock.patch('roll_dep.is_submoduled', return_value=True)
+    @mock.patch('roll_dep.check_call')
+    def testUpdatesSubmodulesInOneCall(self, check_call, _):
+        rolls = {
+            'src/bar': ('head1', 'rev1', '/root/src/bar'),
+            'src/foo': ('head2', 'rev2', '/root/src/foo'),
+        }
+        with mock.patch('sys.stdout'):
+            roll_dep.finalize('Roll deps', '/root/src', rolls)
+
+        self.assertCountEqual([
+            mock.call(['git', 'checkout', '--quiet', 'rev1'],
+                      cwd='/root/src/bar'),
+            mock.call(['git', 'checkout', '--quiet', 'rev2'],
+                      cwd='/root/src/foo'),
+        ], check_call.call_args_list[:2])
+        self.assertEqual([
+            mock.call([
+                'git', 'update-index', '--add', '--cacheinfo',
+                '160000,rev1,src/bar', '--cacheinfo', '160000,rev2,src/foo'
+            ],
+                      cwd='/root/src'),
+            mock.call(['git', 'add', 'DEPS'], cwd='/root/src'),
+            mock.call(['git', 'commit', '--quiet', '--file', '-'],
+                      cwd='/root/src',
+                      stdin=b'Roll deps'),
+        ], check_call.call_args_list[2:])
+
+
+class RunConcurrentlyTest(unittest.TestCase):
+
+    def testKeepsOrder(self):
+        self.assertEqual([0, 1, 4, 9, 16, 25, 36, 49, 64, 81],
+                         roll_dep.run_concurrently(lambda x: x * x, range(10)))
+
+    def testReraises(self):
+
+        def fn(x):
+            if x == 3:
+                raise roll_dep.Error('boom')
+            return x
+
+        with self.assertRaises(roll_dep.Error):
+            roll_dep.run_concurrently(fn, range(5))
+
 
 if __name__ == '__main__':
     level = logging.DEBUG if '-v' in sys.argv else logging.FATAL